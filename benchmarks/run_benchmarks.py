@@ -0,0 +1,538 @@
+"""Benchmark suite for the search and data-loading paths.
+
+Every workload is built from a fixed seed, so two runs on the same machine
+measure the same work. Each run records wall time, node expansions, peak
+memory and map payload size, appends the results to a JSON history file and
+compares them with a stored baseline. The script exits with status 1 when a
+workload is slower (or uses more memory, or sends a bigger map) than the
+baseline allows, or when a map payload grows with its input.
+
+Usage:
+    python benchmarks/run_benchmarks.py                    # quick tier
+    python benchmarks/run_benchmarks.py --tier full        # every scale
+    python benchmarks/run_benchmarks.py --update-baseline  # store a new baseline
+"""
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import folium
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from utils.city_catalog import CityCatalog
+from utils.map_utils import build_base_map, build_route_layer, publish_catalog_layer, static_url
+from utils.meetup_matrix import MeetupMatrix, precompute_meetup_matrix
+from utils.meetup_utils import load_city_graph, run_search
+from utils.warehouse_utils import (
+    setup_warehouse, ucs, run_agent_simulation, iter_agent_simulation, cost_to_go, field_path,
+    random_cost_layer, step_costs
+)
+
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+DEFAULT_HISTORY = os.path.join(RESULTS_DIR, "history.json")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+SEED = 42
+TIERS = ("quick", "full")
+
+# (workload, reference, max ratio): payloads that must stay flat as the input
+# grows, checked within each run. A route adds one coordinate pair per hop; the
+# base map must not grow with the catalog at all.
+PAYLOAD_RATIOS = [
+    ("map/route_layer/hops_500", "map/route_layer/hops_10", 4.0),
+    ("map/base_layer/synthetic_10000", "map/base_layer/csv_528", 1.1),
+    ("map/base_layer/synthetic_100000", "map/base_layer/csv_528", 1.1),
+]
+
+# Workloads that only exist in the full tier take seconds to minutes per run, so
+# they are timed at most this many times whatever --repeat says.
+FULL_TIER_REPEAT = 1
+
+# Measurements below these floors are dominated by noise and never fail a run.
+MIN_TIME_S = 0.005
+MIN_MEMORY_BYTES = 64 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Workload construction
+# ---------------------------------------------------------------------------
+
+def make_synthetic_cities(n, seed=SEED):
+    """Write ``n`` random cities spread over India to a CSV and return its path."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "STATE": [f"State {k}" for k in rng.integers(0, 36, size=n)],
+        "CITY": [f"City {i}" for i in range(n)],
+        "LATITUDE": rng.uniform(8.0, 35.0, size=n),
+        "LONGITUDE": rng.uniform(68.0, 97.0, size=n),
+    })
+    path = os.path.join(tempfile.gettempdir(), f"bench_cities_{n}_{seed}.csv")
+    # Always rewritten, and atomically, so a stale or half-written file from an
+    # interrupted run is never benchmarked.
+    fd, tmp_path = tempfile.mkstemp(suffix=".csv", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            df.to_csv(f, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return path
+
+
+def make_grid(N, M, P, O, seed=SEED):
+    """Build a seeded warehouse with free top-left and bottom-right corners."""
+    np.random.seed(seed)
+    warehouse, packages, dropoffs, obstacles = setup_warehouse(N, M, P, O)
+    warehouse[0][0] = '.'
+    warehouse[N - 1][M - 1] = '.'
+    return warehouse, packages, dropoffs, obstacles
+
+
+def search_pairs(cities, count, seed=SEED):
+    """Pick ``count`` reproducible (start, goal) city pairs."""
+    rng = np.random.default_rng(seed)
+    names = sorted(cities)
+    picks = rng.choice(len(names), size=(count, 2))
+    return [(names[a], names[b]) for a, b in picks if a != b]
+
+
+def _load_workload(data_path):
+    def setup():
+        return data_path
+
+    def run(path):
+        cities, neighbors = load_city_graph(path)
+        return {"cities": len(cities), "edges": sum(len(v) for v in neighbors.values())}
+    return setup, run
+
+
+def _catalog_workload(data_path, queries=200, seed=SEED):
+    def setup():
+        catalog = CityCatalog.from_csv(data_path)
+        rng = np.random.default_rng(seed)
+        names = catalog.names[rng.integers(0, len(catalog), size=queries)]
+        # Type-ahead prefixes plus misspelt names (one character dropped).
+        prefixes = [str(name)[:3] for name in names]
+        typos = [str(name)[:-2] + str(name)[-1] for name in names]
+        catalog.search_fuzzy(typos[0])  # builds the trigram index outside the timing
+        return catalog, prefixes, typos
+
+    def run(state):
+        catalog, prefixes, typos = state
+        matches = 0
+        for prefix in prefixes:
+            matches += len(catalog.search_prefix(prefix))
+        for typo in typos:
+            matches += len(catalog.search_fuzzy(typo))
+        return {"matches": matches}
+    return setup, run
+
+
+def _base_map_workload(data_path):
+    """Render the map a rerun sends; the layer is published once per graph version."""
+    def setup():
+        catalog = CityCatalog.from_csv(data_path)
+        static_dir = tempfile.mkdtemp(prefix="bench_static_")
+        return static_url(publish_catalog_layer(catalog, "bench", static_dir))
+
+    def run(data_url):
+        html = build_base_map(data_url=data_url).get_root().render()
+        return {"payload_bytes": len(html)}
+    return setup, run
+
+
+def _route_layer_workload(data_path, hops):
+    def setup():
+        catalog = CityCatalog.from_csv(data_path)
+        cities = catalog.to_dict()
+        keys = catalog.keys[np.random.default_rng(SEED).integers(0, len(catalog), size=hops + 1)]
+        path = keys.tolist()
+        result = {"path": path, "meeting_point": path[len(path) // 2]}
+        return cities, result
+
+    def run(state):
+        cities, result = state
+        path = result["path"]
+        m = folium.Map()
+        build_route_layer(cities, path[0], path[-1], result).add_to(m)
+        html = m.get_root().render()
+        return {"payload_bytes": len(html)}
+    return setup, run
+
+
+def _search_workload(data_path, algorithm, heuristic_type, pairs=20):
+    def setup():
+        cities, neighbors = load_city_graph(data_path)
+        return cities, neighbors, search_pairs(cities, pairs)
+
+    def run(state):
+        cities, neighbors, queries = state
+        expansions = 0
+        for start, goal in queries:
+            result = run_search(start, goal, algorithm, heuristic_type, cities, neighbors)
+            expansions += result["nodes_generated"]
+        return {"expansions": expansions}
+    return setup, run
+
+
+def _matrix_precompute_workload(data_path, workers):
+    def setup():
+        cities, neighbors = load_city_graph(data_path)
+        return cities, neighbors, tempfile.mkdtemp(prefix="bench_meetup_matrix_")
+
+    def run(state):
+        cities, neighbors, out_dir = state
+        matrix = precompute_meetup_matrix(cities, neighbors, out_dir, workers=workers)
+        return {"cities": len(matrix.keys)}
+    return setup, run
+
+
+def _matrix_lookup_workload(data_path, pairs=20):
+    def setup():
+        cities, neighbors = load_city_graph(data_path)
+        out_dir = tempfile.mkdtemp(prefix="bench_meetup_matrix_")
+        precompute_meetup_matrix(cities, neighbors, out_dir)
+        return MeetupMatrix(out_dir), search_pairs(cities, pairs)
+
+    def run(state):
+        matrix, queries = state
+        hops = 0
+        for start, goal in queries:
+            hops += len(matrix.lookup(start, goal)["path"])
+        return {"path_hops": hops}
+    return setup, run
+
+
+def _ucs_workload(size):
+    def setup():
+        obstacles = min(size * size // 10, 90)
+        warehouse, _, _, _ = make_grid(size, size, 1, obstacles)
+        return warehouse
+
+    def run(warehouse):
+        stats = {}
+        ucs((0, 0), (size - 1, size - 1), warehouse, size, size, stats=stats)
+        return {"expansions": stats.get("expansions", 0)}
+    return setup, run
+
+
+def make_cost_layer(size, kind, seed=SEED):
+    """Cost layer for the weighted-grid workloads.
+
+    ``zones``: unit floor with 10% slow cells (cost 3), the realistic case;
+    ``noise``: every cell a random cost in [1, 3), the worst case for sweeps.
+    """
+    np.random.seed(seed)
+    if kind == "zones":
+        return random_cost_layer(size, size, size * size // 10)
+    return np.random.uniform(1.0, 3.0, (size, size))
+
+
+def _weighted_workload(size, kind, connectivity, engine, queries=1):
+    """Cost from ``queries`` start cells to the bottom-right corner.
+
+    ``heap`` runs one ``ucs`` per query; ``sweep`` computes the move costs and
+    one ``cost_to_go`` field once and follows the field from every start.
+    """
+    def setup():
+        warehouse, _, _, _ = make_grid(size, size, 1, min(size * size // 10, 90))
+        costs = make_cost_layer(size, kind)
+        rng = np.random.default_rng(SEED)
+        starts = [(0, 0)] + [tuple(int(v) for v in rng.integers(0, size, 2)) for _ in range(queries - 1)]
+        starts = [start for start in starts if warehouse[start] != 'O']
+        return warehouse, costs, starts
+
+    def run(state):
+        warehouse, costs, starts = state
+        goal = (size - 1, size - 1)
+        total, stats = 0.0, {}
+        if engine == "heap":
+            for start in starts:
+                _, cost = ucs(start, goal, warehouse, size, size, stats=stats,
+                              costs=costs, connectivity=connectivity)
+                total += cost or 0.0
+        else:
+            steps = step_costs(warehouse, costs, connectivity)
+            field = cost_to_go(goal, warehouse, costs, connectivity, steps=steps)
+            for start in starts:
+                _, cost = field_path(start, goal, field, warehouse, size, size, costs, connectivity,
+                                     steps=steps)
+                total += cost or 0.0
+        return {"expansions": stats.get("expansions", 0), "path_cost": round(total, 6)}
+    return setup, run
+
+
+def _setup_warehouse_workload(size, P, O):
+    def setup():
+        return None
+
+    def run(_):
+        make_grid(size, size, P, O)
+        return {}
+    return setup, run
+
+
+def _simulation_workload(size, P, O):
+    def setup():
+        return make_grid(size, size, P, O)
+
+    def run(state):
+        warehouse, packages, dropoffs, _ = state
+        total_cost, _, _, _ = run_agent_simulation(warehouse, packages, dropoffs)
+        return {"path_cost": total_cost}
+    return setup, run
+
+
+def _simulation_stream_workload(size, P, O):
+    def setup():
+        return make_grid(size, size, P, O)
+
+    def run(state):
+        warehouse, packages, dropoffs, _ = state
+        events = 0
+        for event in iter_agent_simulation(warehouse, packages, dropoffs):
+            events += 1
+        return {"path_cost": event["total_cost"], "events": events}
+    return setup, run
+
+
+def build_workloads(tier):
+    """Return ``(name, setup, run, max_repeat)`` tuples for the requested tier.
+
+    ``max_repeat`` is ``None`` for the quick-tier workloads and
+    ``FULL_TIER_REPEAT`` for the large scales only the full tier adds.
+    """
+    full = tier == "full"
+    csv_path = None  # the bundled 528-city CSV
+    workloads = [
+        ("load_city_data/csv_528", _load_workload(csv_path)),
+        ("city_catalog/csv_528", _catalog_workload(csv_path)),
+        ("map/base_layer/csv_528", _base_map_workload(csv_path)),
+        ("map/route_layer/hops_10", _route_layer_workload(csv_path, 10)),
+        ("map/route_layer/hops_500", _route_layer_workload(csv_path, 500)),
+        ("run_search/csv_528/astar_straight", _search_workload(csv_path, "A*", "Straight-line")),
+        ("run_search/csv_528/astar_road", _search_workload(csv_path, "A*", "Road Distance")),
+        ("run_search/csv_528/greedy_straight", _search_workload(csv_path, "Greedy Best-First", "Straight-line")),
+        ("meetup_matrix/csv_528/precompute_1_worker", _matrix_precompute_workload(csv_path, 1)),
+        ("meetup_matrix/csv_528/precompute_4_workers", _matrix_precompute_workload(csv_path, 4)),
+        ("meetup_matrix/csv_528/lookup", _matrix_lookup_workload(csv_path)),
+    ]
+    if full:
+        for n in (10_000, 100_000):
+            path = make_synthetic_cities(n)
+            workloads.append((f"load_city_data/synthetic_{n}", _load_workload(path)))
+            workloads.append((f"city_catalog/synthetic_{n}", _catalog_workload(path)))
+            workloads.append((f"map/base_layer/synthetic_{n}", _base_map_workload(path)))
+        path = make_synthetic_cities(10_000)
+        workloads.append(("run_search/synthetic_10000/astar_straight",
+                          _search_workload(path, "A*", "Straight-line")))
+
+    grid_sizes = (10, 50, 100, 250) + ((500, 1000, 2000) if full else ())
+    for size in grid_sizes:
+        workloads.append((f"ucs/grid_{size}x{size}", _ucs_workload(size)))
+
+    weighted_cases = [(100, "zones", 1), (100, "noise", 1), (100, "zones", 20)]
+    if full:
+        weighted_cases += [(500, "zones", 1), (500, "noise", 1), (1000, "zones", 1), (2000, "zones", 1)]
+    for size, kind, queries in weighted_cases:
+        for connectivity in (4, 8):
+            for engine in ("heap", "sweep"):
+                if engine == "heap" and size > 1000:
+                    continue  # minutes per run; the sweep is the only practical engine here
+                name = f"grid_costs/{engine}/grid_{size}x{size}/{kind}/conn{connectivity}/queries_{queries}"
+                workloads.append((name, _weighted_workload(size, kind, connectivity, engine, queries)))
+
+    warehouse_cases = [(10, 4, 5), (100, 50, 50)]
+    if full:
+        warehouse_cases += [(500, 500, 90), (2000, 500, 90)]
+    for size, P, O in warehouse_cases:
+        workloads.append((f"setup_warehouse/grid_{size}x{size}/P{P}",
+                          _setup_warehouse_workload(size, P, O)))
+
+    simulation_cases = [(10, 4, 5), (30, 20, 20)]
+    if full:
+        simulation_cases += [(50, 100, 50), (60, 500, 50)]
+    for size, P, O in simulation_cases:
+        workloads.append((f"run_agent_simulation/grid_{size}x{size}/P{P}",
+                          _simulation_workload(size, P, O)))
+        workloads.append((f"iter_agent_simulation/grid_{size}x{size}/P{P}",
+                          _simulation_stream_workload(size, P, O)))
+    quick = {entry[0] for entry in build_workloads("quick")} if full else None
+    return [(name, setup, run, FULL_TIER_REPEAT if full and name not in quick else None)
+            for name, (setup, run) in workloads]
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def measure(setup, run, repeat):
+    """Time ``run`` ``repeat`` times and measure its peak memory once."""
+    state = setup()
+    times = []
+    counters = {}
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        counters = run(state)
+        times.append(time.perf_counter() - start)
+
+    # Traced separately so tracemalloc's overhead does not skew the timings.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {"wall_time": min(times), "peak_memory": peak, "repeat": repeat}
+    result.update(counters)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human readable regressions against ``baseline``."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        checks = [
+            ("wall_time", MIN_TIME_S),
+            ("peak_memory", MIN_MEMORY_BYTES),
+            ("expansions", 0),
+            ("payload_bytes", 0),
+        ]
+        for metric, floor in checks:
+            if metric not in current or metric not in previous:
+                continue
+            old, new = previous[metric], current[metric]
+            if new <= floor:
+                continue
+            if new > old * (1 + tolerance):
+                change = (new / old - 1) * 100 if old else float("inf")
+                regressions.append(f"{name}: {metric} {old:.6g} -> {new:.6g} (+{change:.1f}%)")
+    return regressions
+
+
+def check_payload_ratios(results):
+    """Return a list of human readable ``PAYLOAD_RATIOS`` violations in ``results``."""
+    violations = []
+    for name, reference, max_ratio in PAYLOAD_RATIOS:
+        if name not in results or reference not in results:
+            continue
+        ratio = results[name]["payload_bytes"] / results[reference]["payload_bytes"]
+        if ratio > max_ratio:
+            violations.append(f"{name}: payload_bytes {ratio:.2f}x {reference} (max {max_ratio:g}x)")
+    return violations
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tier", choices=TIERS, default="quick",
+                        help="quick runs small scales only, full adds the 10k/100k city sets and large grids")
+    parser.add_argument("--only", default="*", help="glob pattern selecting workloads by name")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload (the fastest is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a workload counts as a regression")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file the run is appended to")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON file holding baseline results")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run's results as the new baseline instead of comparing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    for name, setup, run, max_repeat in build_workloads(args.tier):
+        if not fnmatch.fnmatch(name, args.only):
+            continue
+        results[name] = measure(setup, run, min(args.repeat, max_repeat or args.repeat))
+        r = results[name]
+        line = f"{name:<55} {r['wall_time'] * 1000:>10.2f} ms {r['peak_memory'] / 1024:>10.1f} KiB"
+        if "expansions" in r:
+            line += f" {r['expansions']:>10} exp"
+        if "payload_bytes" in r:
+            line += f" {r['payload_bytes'] / 1024:>10.1f} KiB sent"
+        print(line, flush=True)
+
+    history = read_json(args.history, [])
+    history.append({
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "tier": args.tier,
+        "seed": SEED,
+        "results": results,
+    })
+    write_json(args.history, history)
+
+    violations = check_payload_ratios(results)
+    if violations:
+        print(f"\n{len(violations)} payload(s) growing with their input:")
+        for line in violations:
+            print(f"  {line}")
+        return 1
+
+    baseline = read_json(args.baseline, {})
+    if args.update_baseline:
+        baseline.update(results)
+        write_json(args.baseline, baseline)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} tolerance:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} tolerance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
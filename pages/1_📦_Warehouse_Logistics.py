@@ -1,6 +1,8 @@
+import os
+import tempfile
 import streamlit as st
 import numpy as np
-from utils.warehouse_utils import setup_warehouse, run_agent_simulation, get_cell_content
+from utils.warehouse_utils import setup_warehouse, iter_agent_simulation, get_cell_content, random_cost_layer
 
 st.set_page_config(page_title="Warehouse Logistics", page_icon="📦")
 
@@ -20,6 +22,14 @@ with st.sidebar:
     M = st.slider("Warehouse Height", min_value=5, max_value=10, value=8)
     P = st.slider("Number of Packages", min_value=2, max_value=6, value=4)
     O = st.slider("Number of Obstacles", min_value=1, max_value=10, value=5)
+    connectivity = st.selectbox(
+        "Agent Moves",
+        [4, 8],
+        format_func=lambda k: "4-way" if k == 4 else "8-way (diagonal)",
+        help="8-way adds diagonal moves costing √2 times the cell cost"
+    )
+    slow_zones = st.slider("Slow Zones", min_value=0, max_value=20, value=0,
+                           help="Cells that cost 3 to enter instead of 1")
 
 # Set random seed
 np.random.seed(seed)
@@ -30,6 +40,7 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.subheader("Warehouse Configuration")
     warehouse, package_locations, dropoff_locations, obstacle_locations = setup_warehouse(N, M, P, O)
+    costs = random_cost_layer(N, M, slow_zones) if slow_zones else None
     
     # Create a stylized version of the warehouse grid with row and column numbers
     html_grid = "<div style='font-family: monospace; line-height: 1.2;'>"
@@ -45,9 +56,11 @@ with col1:
         # Add row number
         html_grid += f"<span style='display: inline-block; width: 25px; color: #666;'>{i}</span>"
         # Add cells
-        for cell in row:
+        for j, cell in enumerate(row):
             cell_type, number = get_cell_content(cell)
-            if cell_type == 'empty':
+            if cell_type == 'empty' and costs is not None and costs[i][j] > 1:
+                html_grid += "<span style='display: inline-block; width: 30px; text-align: center;'>🟨</span>"
+            elif cell_type == 'empty':
                 html_grid += "<span style='display: inline-block; width: 30px; text-align: center;'>⬜</span>"
             elif cell_type == 'obstacle':
                 html_grid += "<span style='display: inline-block; width: 30px; text-align: center;'>🚧</span>"
@@ -65,6 +78,7 @@ with col1:
     st.markdown("""
     **Legend:**
     - ⬜ Empty space
+    - 🟨 Slow zone (cost 3)
     - 🚧 Obstacle
     - 📦₁ Package (numbered)
     - 🎯₁ Drop-off point (numbered)
@@ -77,32 +91,59 @@ with col2:
     st.write("🚧 Obstacles:", obstacle_locations)
 
 # Simulation section
+ARROWS = {(-1, 0): "↑", (1, 0): "↓", (0, -1): "←", (0, 1): "→",
+          (-1, -1): "↖", (-1, 1): "↗", (1, -1): "↙", (1, 1): "↘"}
+
+def format_runs(start, runs):
+    """Show a run-length encoded path as its start cell followed by arrow runs."""
+    return f"{start} " + " ".join(f"{ARROWS[(dr, dc)]}{count}" for dr, dc, count in runs)
+
 st.subheader("Agent Simulation with UCS")
 if st.button("Run Simulation"):
-    with st.spinner("Running simulation..."):
-        total_cost, total_reward, final_reward, paths = run_agent_simulation(
-            warehouse, package_locations, dropoff_locations
-        )
-        
-        if paths is None:
-            st.error("No valid path found! The warehouse configuration might be blocking some routes.")
-        else:
-            # Display results in an organized way
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Cost", total_cost)
-            with col2:
-                st.metric("Total Reward", total_reward)
-            with col3:
-                st.metric("Final Reward", final_reward)
-            
-            # Show detailed path information in an expander
-            with st.expander("View Detailed Paths"):
-                for i, step in enumerate(paths, 1):
-                    st.markdown(f"**Package {i}**")
-                    st.write("Path to package:", step["path_to_package"])
-                    st.write("Path to drop-off:", step["path_to_dropoff"])
-                    st.write("---")
+    # Results are shown leg by leg as the simulation produces them
+    col1, col2, col3 = st.columns(3)
+    cost_metric, reward_metric, final_metric = col1.empty(), col2.empty(), col3.empty()
+    progress = st.progress(0.0, text="Planning the first leg...")
+    details = st.expander("View Detailed Paths")
+    
+    log_file = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False)
+    log_file.close()
+    # The log file is removed even if the simulation raises
+    try:
+        total_cost, total_reward = 0, 0
+        for event in iter_agent_simulation(
+            warehouse, package_locations, dropoff_locations,
+            costs=costs, connectivity=connectivity, log_path=log_file.name
+        ):
+            if event["event"] == "blocked":
+                st.error("No valid path found! The warehouse configuration might be blocking some routes.")
+                break
+            if event["event"] == "move":
+                total_cost += event["cost"]
+                if event["leg"] == "to_package":
+                    details.markdown(f"**Package {event['package']}**")
+                    label = "Path to package"
+                else:
+                    label = "Path to drop-off"
+                details.write(f"{label} ({event['steps']} steps, cost {event['cost']:.2f}): "
+                              f"{format_runs(event['start'], event['runs'])}")
+            elif event["event"] == "drop":
+                total_reward += event["reward"]
+                details.write("---")
+                progress.progress(event["package"] / len(package_locations),
+                                  text=f"Delivered {event['package']} of {len(package_locations)} packages")
+            cost_metric.metric("Total Cost", round(total_cost, 2))
+            reward_metric.metric("Total Reward", total_reward)
+            final_metric.metric("Final Reward", round(total_reward - total_cost, 2))
+        with open(log_file.name) as f:
+            event_log = f.read()
+    finally:
+        os.remove(log_file.name)
+    
+    # on_click="ignore" keeps the results above instead of rerunning the page
+    st.download_button("Download Event Log", event_log, file_name="warehouse_events.jsonl",
+                       help="One JSON event per line; replay it with replay_events()",
+                       on_click="ignore")
 
 # Adding a footer
 
@@ -1,7 +1,10 @@
 import streamlit as st
-import folium
 from streamlit_folium import st_folium
-from utils.meetup_utils import load_city_data, run_search, haversine_distance
+from utils.meetup_utils import load_city_data, run_search, haversine_distance, graph_version
+from utils.map_utils import (
+    build_base_map, build_route_layer, catalog_layer_json, publish_catalog_layer, static_url
+)
+from utils.city_catalog import CityCatalog
 
 st.set_page_config(page_title="City Meetup Search", page_icon="🤝", layout="wide")
 
@@ -13,8 +16,24 @@ Find the optimal meeting point between two cities in India. The search considers
 - Time taken for each person to reach the meeting point
 """)
 
+@st.cache_resource
+def get_city_data():
+    """Load the city graph and catalog once per server process."""
+    cities, neighbors = load_city_data()
+    return cities, neighbors, CityCatalog.from_cities(cities), graph_version(cities, neighbors)
+
+def city_selector(label, state, key):
+    """Select a city of ``state``, optionally narrowed by a type-ahead query."""
+    query = st.text_input(f"Search {label}", key=f"{key}_query", placeholder="Type to filter")
+    options = catalog.search(query, limit=50, state=state) if query else catalog.cities_in_state(state)
+    if not options:
+        st.caption("No matching city; showing all cities of the state.")
+        options = catalog.cities_in_state(state)
+    return st.selectbox(label, options, key=key)
+
 # Load city data
-cities, neighbors = load_city_data()
+cities, neighbors, catalog, version = get_city_data()
+states = catalog.state_names
 
 # Sidebar controls
 with st.sidebar:
@@ -24,22 +43,18 @@ with st.sidebar:
     with col1:
         state1 = st.selectbox(
             "Your State",
-            sorted(set(city["state"] for city in cities.values())),
-            index=sorted(set(city["state"] for city in cities.values())).index("Karnataka")
+            states,
+            index=states.index("Karnataka") if "Karnataka" in states else 0
         )
     with col2:
         state2 = st.selectbox(
             "Friend's State",
-            sorted(set(city["state"] for city in cities.values())),
-            index=sorted(set(city["state"] for city in cities.values())).index("Rajasthan")
+            states,
+            index=states.index("Rajasthan") if "Rajasthan" in states else 0
         )
     
-    # Filter cities by selected states
-    cities_state1 = {name: info for name, info in cities.items() if info["state"] == state1}
-    cities_state2 = {name: info for name, info in cities.items() if info["state"] == state2}
-    
-    my_city = st.selectbox("Your City", sorted(cities_state1.keys()))
-    friend_city = st.selectbox("Friend's City", sorted(cities_state2.keys()))
+    my_city = city_selector("Your City", state1, "my_city")
+    friend_city = city_selector("Friend's City", state2, "friend_city")
     
     st.markdown("---")
     
@@ -55,102 +70,28 @@ with st.sidebar:
         help="A* considers both path cost and heuristic, Greedy only uses heuristic"
     )
 
-# Initialize session state for map view
-if 'map_center' not in st.session_state:
-    st.session_state.map_center = None
-if 'map_zoom' not in st.session_state:
-    st.session_state.map_zoom = 5
 if 'search_result' not in st.session_state:
     st.session_state.search_result = None
 
-def create_map(cities, my_city, friend_city, search_result=None):
-    # Use stored map center and zoom if available, otherwise calculate default
-    if st.session_state.map_center:
-        center_lat, center_lon = st.session_state.map_center
-        zoom_start = st.session_state.map_zoom
-    else:
-        center_lat = (cities[my_city]["lat"] + cities[friend_city]["lat"]) / 2
-        center_lon = (cities[my_city]["lon"] + cities[friend_city]["lon"]) / 2
-        zoom_start = 5
-        st.session_state.map_center = [center_lat, center_lon]
-    
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom_start)
-    
-    if search_result is None or not search_result.get('path'):
-        # Show only source and destination cities
-        for city in [my_city, friend_city]:
-            color = "green" if city == my_city else "blue"
-            folium.Marker(
-                location=[cities[city]["lat"], cities[city]["lon"]],
-                popup=f"{city} ({cities[city]['state']})",
-                icon=folium.Icon(color=color, icon="star")
-            ).add_to(m)
-    else:
-        # Show path and meeting point
-        for i, city in enumerate(search_result['path']):
-            color = "green" if city == my_city else "blue" if city == friend_city else "red"
-            icon = "star" if city in [my_city, friend_city] else "info-sign"
-            
-            folium.Marker(
-                location=[cities[city]["lat"], cities[city]["lon"]],
-                popup=f"{city} ({cities[city]['state']})",
-                icon=folium.Icon(color=color, icon=icon)
-            ).add_to(m)
-            
-            if i < len(search_result['path']) - 1:
-                next_city = search_result['path'][i + 1]
-                points = [
-                    [cities[city]["lat"], cities[city]["lon"]],
-                    [cities[next_city]["lat"], cities[next_city]["lon"]]
-                ]
-                folium.PolyLine(
-                    points,
-                    weight=3,
-                    color="red",
-                    opacity=0.8
-                ).add_to(m)
-        
-        if search_result.get('meeting_point'):
-            meeting_city = search_result['meeting_point']
-            folium.Marker(
-                location=[cities[meeting_city]["lat"], cities[meeting_city]["lon"]],
-                popup=f"Meeting Point: {meeting_city}",
-                icon=folium.Icon(color="purple", icon="flag")
-            ).add_to(m)
-    
-    return m
+@st.cache_data
+def get_catalog_layer(version, _catalog):
+    """Publish the clustered city layer once per graph version.
 
-# Main content area
-col1, col2 = st.columns([3, 1])
+    With static serving on, the browser fetches the layer from a versioned
+    file, so every rerun sends the same small map. Otherwise it is embedded.
+    """
+    if st.get_option("server.enableStaticServing"):
+        file_name = publish_catalog_layer(_catalog, version)
+        return {"data_url": static_url(file_name, st.get_option("server.baseUrlPath"))}
+    return {"data_json": catalog_layer_json(_catalog)}
 
-with col1:
-    st.subheader("Interactive Map")
-    # Create and display map based on current state
-    m = create_map(cities, my_city, friend_city, st.session_state.search_result)
-    
-    # Use st_folium with key parameter only
-    map_data = st_folium(
-        m,
-        width=900,
-        height=600,
-        key="main_map"
-     
+# Main content area
+map_col, selection_col = st.columns([3, 1])
 
-    )
-    
-    # Update map center and zoom based on user interaction
-    if map_data:
-        try:
-            center = map_data['bounds']['center']
-            st.session_state.map_center = [center['lat'], center['lng']]
-            st.session_state.map_zoom = map_data.get('zoom', 5)
-        except (KeyError, TypeError):
-            pass
-
-with col2:
+with selection_col:
     st.subheader("Current Selection")
-    st.write(f"**Your Location:** {my_city}, {cities[my_city]['state']}")
-    st.write(f"**Friend's Location:** {friend_city}, {cities[friend_city]['state']}")
+    st.write(f"**Your Location:** {cities[my_city]['city']}, {cities[my_city]['state']}")
+    st.write(f"**Friend's Location:** {cities[friend_city]['city']}, {cities[friend_city]['state']}")
     
     # Calculate direct distance
     direct_distance = haversine_distance(
@@ -218,6 +159,30 @@ if st.button("Find Optimal Meeting Point", type="primary"):
                 if time_taken is not None:
                     st.write(f"Search time: {time_taken*1000:.1f} ms")
 
+# Drawn after the search so a new result shows up on this run
+with map_col:
+    st.subheader("Interactive Map")
+    # Only the route layer changes between reruns; the city layer is cached
+    search_result = st.session_state.search_result
+    if search_result and search_result.get('path') and (
+            search_result['path'][0] != my_city or search_result['path'][-1] != friend_city):
+        search_result = None
+    route_layer = build_route_layer(cities, my_city, friend_city, search_result)
+    
+    st_folium(
+        build_base_map(**get_catalog_layer(version, catalog)),
+        width=900,
+        height=600,
+        key="main_map",
+        center=[
+            (cities[my_city]["lat"] + cities[friend_city]["lat"]) / 2,
+            (cities[my_city]["lon"] + cities[friend_city]["lon"]) / 2
+        ],
+        zoom=5,
+        feature_group_to_add=route_layer,
+        returned_objects=[]
+    )
+
 # Adding a footer
 
 st.markdown(
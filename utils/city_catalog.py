@@ -0,0 +1,179 @@
+import os
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data", "india_states_districts_cities_coordinates.csv"
+)
+
+
+def _trigrams(text):
+    """Return the set of character trigrams of a padded, lower-cased string."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityCatalog:
+    """Columnar city store with stable integer IDs and lookup indexes.
+
+    City ``i`` is described by ``keys[i]``, ``names[i]``, ``states[i]``,
+    ``lat[i]`` and ``lon[i]``. Keys are unique: a city name shared by towns in
+    different states becomes ``"<city>, <state>"``.
+    """
+
+    def __init__(self, keys, names, states, lat, lon):
+        self.keys = np.asarray(keys, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.states = np.asarray(states, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self._id_by_key = {key: i for i, key in enumerate(self.keys)}
+        if len(self._id_by_key) != len(self.keys):
+            raise ValueError("City keys must be unique")
+
+        # State -> city IDs, ordered by key so selectors need no sorting.
+        codes, state_names = pd.factorize(self.states, sort=True)
+        self.state_names = [str(s) for s in state_names]
+        order = np.lexsort((self.keys.astype(str), codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(state_names) + 1))
+        self._ids_by_state = {
+            state: order[bounds[k]:bounds[k + 1]]
+            for k, state in enumerate(self.state_names)
+        }
+
+        # Prefix index: lower-cased keys in sorted order.
+        lowered = np.array([str(k).lower() for k in self.keys], dtype=str)
+        self._prefix_order = np.argsort(lowered, kind="stable")
+        self._prefix_keys = lowered[self._prefix_order]
+
+        # The trigram index is only built on the first fuzzy lookup.
+        self._gram_ids = None
+        self._gram_counts = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build a catalog from a frame with STATE, CITY, LATITUDE, LONGITUDE columns."""
+        df = df.dropna(subset=["LATITUDE", "LONGITUDE"])
+        df = df.drop_duplicates(subset=["STATE", "CITY", "LATITUDE", "LONGITUDE"]).reset_index(drop=True)
+        names = df["CITY"].astype(str).str.strip()
+        states = df["STATE"].astype(str).str.strip()
+        shared = names.duplicated(keep=False)
+        keys = names.where(~shared, names + ", " + states)
+        # The same city listed twice in one state keeps its rows apart by number.
+        repeat = keys.groupby(keys).cumcount()
+        keys = keys.where(repeat == 0, keys + " (" + (repeat + 1).astype(str) + ")")
+        return cls(keys.to_numpy(), names.to_numpy(), states.to_numpy(),
+                   df["LATITUDE"].to_numpy(), df["LONGITUDE"].to_numpy())
+
+    @classmethod
+    def from_csv(cls, data_path=None):
+        """Load the catalog from a city CSV (the bundled Indian cities by default)."""
+        if data_path is None:
+            data_path = DEFAULT_DATA_PATH
+        if not os.path.exists(data_path):
+            raise FileNotFoundError(f"CSV file not found at: {data_path}")
+        return cls.from_frame(pd.read_csv(data_path))
+
+    @classmethod
+    def from_cities(cls, cities):
+        """Build a catalog from the ``cities`` dict returned by ``load_city_data``."""
+        keys = list(cities)
+        return cls(
+            keys,
+            [cities[k].get("city", k) for k in keys],
+            [cities[k]["state"] for k in keys],
+            [cities[k]["lat"] for k in keys],
+            [cities[k]["lon"] for k in keys],
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._id_by_key
+
+    def id_of(self, key):
+        """Return the integer ID of a city key."""
+        return self._id_by_key[key]
+
+    def key_of(self, city_id):
+        """Return the key of a city ID."""
+        return self.keys[city_id]
+
+    def to_dict(self):
+        """Return cities in the ``{key: {"lat", "lon", "state", "city"}}`` form."""
+        return {
+            key: {"lat": float(lat), "lon": float(lon), "state": state, "city": name}
+            for key, name, state, lat, lon in zip(
+                self.keys, self.names, self.states, self.lat, self.lon)
+        }
+
+    def ids_in_state(self, state):
+        """Return the city IDs of a state, ordered by key."""
+        return self._ids_by_state.get(state, np.empty(0, dtype=np.intp))
+
+    def cities_in_state(self, state):
+        """Return the city keys of a state in sorted order."""
+        return self.keys[self.ids_in_state(state)].tolist()
+
+    def _restrict(self, ids, state):
+        if state is None:
+            return ids
+        return ids[self.states[ids] == state]
+
+    def search_prefix(self, prefix, limit=10, state=None):
+        """Return up to ``limit`` keys starting with ``prefix`` (case-insensitive)."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        lo = np.searchsorted(self._prefix_keys, prefix, side="left")
+        hi = np.searchsorted(self._prefix_keys, prefix + "\U0010ffff", side="right")
+        ids = self._restrict(self._prefix_order[lo:hi], state)
+        return self.keys[ids[:limit]].tolist()
+
+    def _build_gram_index(self):
+        postings = {}
+        counts = np.empty(len(self.keys), dtype=np.int32)
+        for i, key in enumerate(self.keys):
+            grams = _trigrams(str(key))
+            counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._gram_ids = {g: np.array(ids, dtype=np.intp) for g, ids in postings.items()}
+        self._gram_counts = counts
+
+    def search_fuzzy(self, query, limit=10, state=None, min_score=0.2):
+        """Return up to ``limit`` keys most similar to ``query`` by trigram overlap."""
+        query = query.strip()
+        if not query:
+            return []
+        if self._gram_ids is None:
+            self._build_gram_index()
+        grams = _trigrams(query)
+        hits = [self._gram_ids[g] for g in grams if g in self._gram_ids]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        candidates = np.nonzero(shared)[0]
+        candidates = self._restrict(candidates, state)
+        if len(candidates) == 0:
+            return []
+        # Jaccard similarity of the two trigram sets.
+        common = shared[candidates]
+        score = common / (len(grams) + self._gram_counts[candidates] - common)
+        keep = score >= min_score
+        candidates, score = candidates[keep], score[keep]
+        order = np.lexsort((self.keys[candidates].astype(str), -score))[:limit]
+        return self.keys[candidates[order]].tolist()
+
+    def search(self, query, limit=10, state=None):
+        """Type-ahead lookup: prefix matches first, then fuzzy matches."""
+        results = self.search_prefix(query, limit, state)
+        if len(results) < limit:
+            for key in self.search_fuzzy(query, limit, state):
+                if key not in results:
+                    results.append(key)
+                    if len(results) == limit:
+                        break
+        return results
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import folium
+from folium.plugins import MarkerCluster
+from folium.template import Template
+
+INDIA_CENTER = (22.5, 79.0)
+
+# Served by Streamlit at /app/static/ when server.enableStaticServing is on.
+STATIC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"
+)
+
+# Builds one marker per catalog row [lat, lon, label] in the browser.
+CITY_MARKER_CALLBACK = """
+var callback = function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 5, weight: 1});
+    marker.bindPopup(row[2]);
+    return marker;
+};
+"""
+
+
+class SerializedMarkerCluster(MarkerCluster):
+    """Marker cluster whose ``[[lat, lon, label], ...]`` rows are already serialized.
+
+    The rows are either embedded as a JSON string (``data_json``) or fetched
+    by the browser from ``data_url``. Fetching keeps the map HTML the same
+    size however many rows the layer has.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                var addRows = function (data) {
+                    cluster.addLayers(data.map(callback));
+                };
+                {% if this.data_url %}
+                fetch({{ this.data_url|tojson }})
+                    .then(function (response) { return response.json(); })
+                    .then(addRows);
+                {% else %}
+                addRows({{ this.data_json }});
+                {% endif %}
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, callback, data_json=None, data_url=None, name=None, **kwargs):
+        if (data_json is None) == (data_url is None):
+            raise ValueError("Pass exactly one of data_json and data_url")
+        super().__init__(name=name, **kwargs)
+        # "</" would end the surrounding <script> tag early.
+        self.data_json = None if data_json is None else data_json.replace("</", "<\\/")
+        self.data_url = data_url
+        self.callback = callback
+
+
+def catalog_layer_json(catalog):
+    """Serialize the catalog as ``[[lat, lon, label], ...]`` for the cluster layer."""
+    labels = [f"{key} ({state})" for key, state in zip(catalog.keys, catalog.states)]
+    rows = zip(catalog.lat.round(5).tolist(), catalog.lon.round(5).tolist(), labels)
+    return json.dumps([list(row) for row in rows], separators=(",", ":"))
+
+
+def publish_catalog_layer(catalog, version, static_dir=STATIC_DIR):
+    """Write the catalog layer to ``city_layer_<version>.json`` once; returns the file name.
+
+    The file is written atomically, so an existing file is always complete.
+    """
+    file_name = f"city_layer_{version}.json"
+    path = os.path.join(static_dir, file_name)
+    if not os.path.exists(path):
+        os.makedirs(static_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".json", dir=static_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(catalog_layer_json(catalog))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return file_name
+
+
+def static_url(file_name, base_url_path=""):
+    """Return the URL Streamlit serves ``static/<file_name>`` at."""
+    parts = [base_url_path.strip("/"), "app", "static", file_name]
+    return "/" + "/".join(part for part in parts if part)
+
+
+def build_base_map(data_url=None, data_json=None, center=INDIA_CENTER, zoom=5):
+    """Create the static map: tiles plus every catalog city as a clustered layer.
+
+    Pass the layer as ``data_url`` (see ``publish_catalog_layer``) so the map
+    HTML stays a fixed size, or as ``data_json`` (``catalog_layer_json``) to
+    embed it.
+    """
+    m = folium.Map(location=list(center), zoom_start=zoom)
+    SerializedMarkerCluster(
+        CITY_MARKER_CALLBACK,
+        data_json=data_json,
+        data_url=data_url,
+        name="Cities",
+        disableClusteringAtZoom=10,
+    ).add_to(m)
+    return m
+
+
+def build_route_layer(cities, my_city, friend_city, search_result=None):
+    """Create the per-search layer: both endpoints, the route and the meeting point.
+
+    The route is a single polyline, so the layer stays a handful of elements
+    however many hops the path has.
+    """
+    layer = folium.FeatureGroup(name="Route")
+    for city, color in ((my_city, "green"), (friend_city, "blue")):
+        folium.Marker(
+            location=[cities[city]["lat"], cities[city]["lon"]],
+            popup=f"{city} ({cities[city]['state']})",
+            icon=folium.Icon(color=color, icon="star")
+        ).add_to(layer)
+
+    if search_result and search_result.get('path'):
+        folium.PolyLine(
+            [[cities[city]["lat"], cities[city]["lon"]] for city in search_result['path']],
+            weight=3,
+            color="red",
+            opacity=0.8
+        ).add_to(layer)
+
+        meeting_city = search_result.get('meeting_point')
+        if meeting_city:
+            folium.Marker(
+                location=[cities[meeting_city]["lat"], cities[meeting_city]["lon"]],
+                popup=f"Meeting Point: {meeting_city}",
+                icon=folium.Icon(color="purple", icon="flag")
+            ).add_to(layer)
+    return layer
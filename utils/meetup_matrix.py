@@ -0,0 +1,209 @@
+"""All-pairs meetup matrix.
+
+Runs one single-source shortest-path tree per city over the compiled city
+graph and stores the results as memory-mapped ``.npy`` matrices:
+
+- ``dist.npy``: float32 ``dist[i, j]``, the cost of the cheapest path from
+  city ``i`` to city ``j`` (``inf`` when unreachable);
+- ``next_hop.npy``: int32 ``next_hop[i, j]``, the city after ``i`` on that
+  path (``-1`` when unreachable).
+
+The graph is placed in shared memory once and every worker process reads it
+from there; workers write disjoint row blocks straight into the memory-mapped
+outputs. Afterwards the cost, path and meeting point of any pair are looked up
+in O(path length) with ``MeetupMatrix``.
+
+Usage:
+    python -m utils.meetup_matrix --out meetup_matrix --workers 4
+"""
+import argparse
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.meetup_utils import compile_graph, graph_version, load_city_graph
+
+DIST_FILE = "dist.npy"
+NEXT_HOP_FILE = "next_hop.npy"
+META_FILE = "meta.json"
+
+# Per-process state set up by _attach_worker.
+_graph = {}
+
+
+def _share(array, blocks):
+    """Copy ``array`` into a new shared memory block and describe it."""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    blocks.append(shm)
+    return (shm.name, array.shape, array.dtype.str)
+
+
+def _attach_worker(shared, out_dir):
+    """Map the shared graph and the output matrices into this process."""
+    _graph.clear()
+    for name, (shm_name, shape, dtype) in shared.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _graph[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        _graph[f"_{name}_shm"] = shm  # keep the mapping alive
+    _graph["dist"] = np.load(os.path.join(out_dir, DIST_FILE), mmap_mode="r+")
+    _graph["next_hop"] = np.load(os.path.join(out_dir, NEXT_HOP_FILE), mmap_mode="r+")
+
+
+def _shortest_path_tree(source, indptr, indices, weights, n):
+    """Dijkstra from ``source``; returns cost and first-hop lists for every city."""
+    dist = [float('inf')] * n
+    first_hop = [-1] * n
+    dist[source] = 0.0
+    first_hop[source] = source
+    frontier = [(0.0, source)]
+
+    while frontier:
+        cost, current = heapq.heappop(frontier)
+        if cost > dist[current]:
+            continue
+        lo, hi = indptr[current], indptr[current + 1]
+        hop = first_hop[current]
+        for next_city, weight in zip(indices[lo:hi].tolist(), weights[lo:hi].tolist()):
+            new_cost = cost + weight
+            if new_cost < dist[next_city]:
+                dist[next_city] = new_cost
+                first_hop[next_city] = next_city if current == source else hop
+                heapq.heappush(frontier, (new_cost, next_city))
+    return dist, first_hop
+
+
+def _solve_rows(start, stop):
+    """Fill rows ``start:stop`` of the output matrices."""
+    indptr, indices, weights = _graph["indptr"], _graph["indices"], _graph["weights"]
+    n = len(indptr) - 1
+    for source in range(start, stop):
+        dist, first_hop = _shortest_path_tree(source, indptr, indices, weights, n)
+        _graph["dist"][source] = dist
+        _graph["next_hop"][source] = first_hop
+    _graph["dist"].flush()
+    _graph["next_hop"].flush()
+    return stop - start
+
+
+def precompute_meetup_matrix(cities, neighbors, out_dir, workers=None, block_size=64):
+    """Compute the all-pairs cost and next-hop matrices into ``out_dir``."""
+    keys, indptr, indices, weights = compile_graph(cities, neighbors)
+    n = len(keys)
+    if n == 0:
+        raise ValueError("No cities to precompute")
+    os.makedirs(out_dir, exist_ok=True)
+
+    dist = np.lib.format.open_memmap(
+        os.path.join(out_dir, DIST_FILE), mode="w+", dtype=np.float32, shape=(n, n))
+    dist[:] = np.inf
+    next_hop = np.lib.format.open_memmap(
+        os.path.join(out_dir, NEXT_HOP_FILE), mode="w+", dtype=np.int32, shape=(n, n))
+    next_hop[:] = -1
+    del dist, next_hop  # flushed; workers reopen the files
+
+    blocks = []
+    start_time = time.time()
+    try:
+        shared = {
+            "indptr": _share(indptr, blocks),
+            "indices": _share(indices, blocks),
+            "weights": _share(weights, blocks),
+        }
+        ranges = [(lo, min(lo + block_size, n)) for lo in range(0, n, block_size)]
+        if workers == 1:
+            _attach_worker(shared, out_dir)
+            for lo, hi in ranges:
+                _solve_rows(lo, hi)
+            _graph.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                     initargs=(shared, out_dir)) as pool:
+                list(pool.map(_solve_rows, *zip(*ranges)))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    meta = {
+        "keys": keys,
+        "graph_version": graph_version(cities, neighbors),
+        "time_taken": time.time() - start_time,
+    }
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    return MeetupMatrix(out_dir)
+
+
+class MeetupMatrix:
+    """Read-only view of a precomputed meetup matrix directory."""
+
+    def __init__(self, out_dir):
+        with open(os.path.join(out_dir, META_FILE)) as f:
+            meta = json.load(f)
+        self.keys = meta["keys"]
+        self.version = meta["graph_version"]
+        self._index = {key: i for i, key in enumerate(self.keys)}
+        self.dist = np.load(os.path.join(out_dir, DIST_FILE), mmap_mode="r")
+        self.next_hop = np.load(os.path.join(out_dir, NEXT_HOP_FILE), mmap_mode="r")
+
+    def is_current(self, cities, neighbors):
+        """Return whether the matrix was computed for this city graph."""
+        return self.version == graph_version(cities, neighbors)
+
+    def cost(self, my_city, friend_city):
+        """Return the cheapest travel cost between two cities."""
+        return float(self.dist[self._index[my_city], self._index[friend_city]])
+
+    def path(self, my_city, friend_city):
+        """Return the cheapest path as a list of city keys (empty if unreachable)."""
+        current, goal = self._index[my_city], self._index[friend_city]
+        if self.next_hop[current, goal] < 0:
+            return []
+        path = [self.keys[current]]
+        for _ in range(len(self.keys)):
+            if current == goal:
+                return path
+            current = int(self.next_hop[current, goal])
+            path.append(self.keys[current])
+        raise RuntimeError("Corrupt next-hop matrix: path does not reach its goal")
+
+    def lookup(self, my_city, friend_city):
+        """Return a ``run_search``-style result read from the matrix."""
+        start_time = time.time()
+        path = self.path(my_city, friend_city)
+        return {
+            "path": path,
+            "total_cost": self.cost(my_city, friend_city),
+            "nodes_generated": 0,
+            "time_taken": time.time() - start_time,
+            "meeting_point": path[len(path) // 2] if path else None
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute the all-pairs meetup matrix.")
+    parser.add_argument("--out", default="meetup_matrix", help="output directory")
+    parser.add_argument("--data", default=None, help="city CSV (the bundled one by default)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--block-size", type=int, default=64, help="source cities per task")
+    args = parser.parse_args(argv)
+
+    # Not load_city_data: its two-city fallback would be precomputed silently.
+    try:
+        cities, neighbors = load_city_graph(args.data)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"cannot load city data: {e}")
+    start_time = time.time()
+    matrix = precompute_meetup_matrix(cities, neighbors, args.out, args.workers, args.block_size)
+    print(f"{len(matrix.keys)} cities precomputed into {args.out} "
+          f"in {time.time() - start_time:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
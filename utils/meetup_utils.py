@@ -1,9 +1,9 @@
 import numpy as np
 import time
 import heapq
+import hashlib
 from math import radians, cos, sin, asin, sqrt
-import pandas as pd
-import os
+from utils.city_catalog import CityCatalog
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """Calculate the great circle distance between two points in kilometers."""
@@ -15,70 +15,115 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     r = 6371  # Radius of Earth in kilometers
     return c * r
 
-def load_city_data():
-    """Load city data from CSV file containing Indian cities."""
+def haversine_distances(lat, lon, lats, lons):
+    """Vectorized great circle distances in kilometers from one point to many."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2)**2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2)**2
+    return 2 * 6371 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def build_neighbors(catalog, distance_threshold=150, min_neighbors=2, fallback_neighbors=3):
+    """Link every city to the cities within ``distance_threshold`` km of it.
+
+    Cities are bucketed into latitude/longitude cells at least
+    ``distance_threshold`` wide, so each city is only compared with the
+    cities of its own and the eight surrounding cells.
+    """
+    keys, lat, lon = catalog.keys, catalog.lat, catalog.lon
+    neighbors = {}
+    if len(keys) == 0:
+        return neighbors
+
+    # Largest latitude and longitude differences two cities within the
+    # threshold can have (longitude degrees shrink away from the equator).
+    reach = distance_threshold / 6371
+    cell_lat = np.degrees(reach) * 1.000001
+    cos_lat = np.cos(np.radians(np.abs(lat).max()))
+    cell_lon = np.degrees(2 * np.arcsin(min(1.0, np.sin(reach / 2) / max(cos_lat, 1e-12)))) * 1.000001
+    cells = {}
+    for i, cell in enumerate(zip(np.floor(lat / cell_lat).astype(int).tolist(),
+                                 np.floor(lon / cell_lon).astype(int).tolist())):
+        cells.setdefault(cell, []).append(i)
+    cells = {cell: np.array(ids) for cell, ids in cells.items()}
+
+    close_ids = [None] * len(keys)
+    for (row, col), members in cells.items():
+        candidates = np.sort(np.concatenate([
+            cells[(row + dr, col + dc)]
+            for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (row + dr, col + dc) in cells
+        ]))
+        # Blocks of members keep the distance matrix small in dense cells.
+        for start in range(0, len(members), 1024):
+            block = members[start:start + 1024]
+            distances = haversine_distances(lat[block][:, None], lon[block][:, None],
+                                            lat[candidates], lon[candidates])
+            distances[block[:, None] == candidates] = np.inf
+            for i, row_distances in zip(block, distances):
+                close_ids[i] = candidates[row_distances < distance_threshold]
+
+    for i, city1 in enumerate(keys):
+        close = close_ids[i]
+        neighbors[city1] = keys[close].tolist()
+
+        # Ensure each city has at least 2-3 neighbors
+        if len(close) < min_neighbors:
+            distances = haversine_distances(lat[i], lon[i], lat, lon)
+            distances[i] = np.inf
+            closest = np.argsort(distances, kind="stable")[:fallback_neighbors]
+            for j in closest:
+                if np.isfinite(distances[j]) and keys[j] not in neighbors[city1]:
+                    neighbors[city1].append(keys[j])
+    return neighbors
+
+def graph_version(cities, neighbors):
+    """Return a short fingerprint of the city graph, used as a cache key."""
+    digest = hashlib.sha1()
+    for key, info in cities.items():
+        edges = ",".join(neighbors.get(key, []))
+        digest.update(f"{key}|{info['lat']:.6f}|{info['lon']:.6f}|{edges}\n".encode())
+    return digest.hexdigest()[:12]
+
+def compile_graph(cities, neighbors):
+    """Compile the city graph to CSR arrays weighted like ``run_search``.
+
+    Returns ``(keys, indptr, indices, weights)``: the outgoing edges of city
+    ``keys[i]`` are ``indices[indptr[i]:indptr[i + 1]]`` with costs
+    ``weights[indptr[i]:indptr[i + 1]]`` (twice the haversine distance).
+    """
+    keys = list(cities)
+    index = {key: i for i, key in enumerate(keys)}
+    lat = np.array([cities[key]["lat"] for key in keys], dtype=np.float64)
+    lon = np.array([cities[key]["lon"] for key in keys], dtype=np.float64)
+
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    targets = []
+    for i, key in enumerate(keys):
+        row = [index[city] for city in neighbors.get(key, []) if city in index]
+        targets.append(row)
+        indptr[i + 1] = indptr[i] + len(row)
+
+    indices = np.fromiter((j for row in targets for j in row), dtype=np.int32, count=indptr[-1])
+    sources = np.repeat(np.arange(len(keys)), np.diff(indptr))
+    weights = 2 * haversine_distances(lat[sources], lon[sources], lat[indices], lon[indices])
+    return keys, indptr, indices, weights
+
+def load_city_graph(data_path=None):
+    """Load cities and their neighbours from a city CSV, raising on any error.
+
+    Cities are keyed by name, or by ``"<city>, <state>"`` when towns in
+    different states share a name.
+    """
+    catalog = CityCatalog.from_csv(data_path)
+    return catalog.to_dict(), build_neighbors(catalog)
+
+def load_city_data(data_path=None):
+    """Load city data from CSV file containing Indian cities.
+
+    Same as ``load_city_graph``, but falls back to a two-city graph when the
+    CSV cannot be loaded, so the app still starts.
+    """
     try:
-        # Get absolute path to the data file
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        data_path = os.path.join(base_dir, "data", "india_states_districts_cities_coordinates.csv")
-        
-        if not os.path.exists(data_path):
-            raise FileNotFoundError(f"CSV file not found at: {data_path}")
-
-        # Load CSV file
-        df = pd.read_csv(data_path)
-        
-        # Create cities dictionary
-        cities = {}
-        for _, row in df.iterrows():
-            # Skip entries with missing coordinates.
-            if pd.isna(row['LATITUDE']) or pd.isna(row['LONGITUDE']):
-                continue
-                
-            city_key = f"{row['CITY']}"
-            cities[city_key] = {
-                "lat": float(row['LATITUDE']),
-                "lon": float(row['LONGITUDE']),
-                "state": row['STATE'],
-                
-                "city": row['CITY']
-            }
-        
-        # Build neighbors dictionary based on distance
-        neighbors = {}
-        distance_threshold = 150  # kilometers
-        
-        for city1 in cities:
-            neighbors[city1] = []
-            city1_info = cities[city1]
-            
-            for city2 in cities:
-                if city1 != city2:
-                    city2_info = cities[city2]
-                    # Calculate distance between cities
-                    distance = haversine_distance(
-                        city1_info['lat'], city1_info['lon'],
-                        city2_info['lat'], city2_info['lon']
-                    )
-                    # If cities are within threshold distance and in same or adjacent state
-                    if distance < distance_threshold:
-                        neighbors[city1].append(city2)
-            
-            # Ensure each city has at least 2-3 neighbors
-            if len(neighbors[city1]) < 2:
-                # Find closest cities if not enough neighbors
-                distances = [(city2, haversine_distance(
-                    city1_info['lat'], city1_info['lon'],
-                    cities[city2]['lat'], cities[city2]['lon']
-                )) for city2 in cities if city2 != city1]
-                
-                distances.sort(key=lambda x: x[1])
-                # Add closest cities as neighbors
-                for city, _ in distances[:3]:
-                    if city not in neighbors[city1]:
-                        neighbors[city1].append(city)
-        
-        return cities, neighbors
+        return load_city_graph(data_path)
 
     except Exception as e:
         print(f"Error loading city data: {e}")
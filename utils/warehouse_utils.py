@@ -1,6 +1,12 @@
+import json
 import numpy as np
+from math import sqrt
 from queue import PriorityQueue
 
+# Moves as (row, column) offsets; the first four are the 4-connected ones.
+MOVES = [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)]
+MOVE_LENGTHS = [1, 1, 1, 1, sqrt(2), sqrt(2), sqrt(2), sqrt(2)]
+
 def get_cell_content(cell):
     """Safely parse cell content and return type and number."""
     if isinstance(cell, str):
@@ -27,8 +33,46 @@ def get_cell_display(cell):
         return f'D{number}'
     return str(cell)
 
-def setup_warehouse(N=8, M=8, P=4, O=5):
-    """Initialize warehouse grid with packages, drop-off points, and obstacles."""
+def grid_moves(connectivity=4):
+    """Return the moves allowed for 4- or 8-connectivity."""
+    if connectivity not in (4, 8):
+        raise ValueError("Connectivity must be 4 or 8")
+    return MOVES[:connectivity]
+
+def cost_layer(costs, N, M, connectivity=4):
+    """Validate a cost layer and return it with one plane per move.
+
+    ``costs`` is either an ``(N, M)`` array holding the cost of entering each
+    cell, or a ``(connectivity, N, M)`` array holding it per move direction
+    (in ``MOVES`` order), which models one-way aisles. Moves cost the entry
+    cost times the move length; ``inf`` makes a cell impassable. Returns
+    ``None`` when ``costs`` is ``None`` (unit costs).
+    """
+    if costs is None:
+        return None
+    costs = np.asarray(costs, dtype=np.float64)
+    K = len(grid_moves(connectivity))
+    if costs.shape == (N, M):
+        costs = np.broadcast_to(costs, (K, N, M))
+    elif costs.shape != (K, N, M):
+        raise ValueError(f"Cost layer must have shape {(N, M)} or {(K, N, M)}")
+    if np.isnan(costs).any() or (costs <= 0).any():
+        raise ValueError("Costs must be positive numbers")
+    return costs
+
+def random_cost_layer(N, M, slow_cells, slow_cost=3.0):
+    """Return an ``(N, M)`` cost layer of unit cells with ``slow_cells`` slow zones."""
+    costs = np.ones((N, M))
+    cells = np.random.choice(N * M, size=min(slow_cells, N * M), replace=False)
+    costs.flat[cells] = slow_cost
+    return costs
+
+def setup_warehouse(N=8, M=8, P=4, O=5, costs=None, connectivity=4):
+    """Initialize warehouse grid with packages, drop-off points, and obstacles.
+
+    Packages and drop-off points are never placed on cells the optional cost
+    layer makes impassable.
+    """
     # Validate input parameters
     if N <= 0 or M <= 0:
         raise ValueError("Grid dimensions must be positive")
@@ -39,6 +83,9 @@ def setup_warehouse(N=8, M=8, P=4, O=5):
     if P + O >= N * M:
         raise ValueError("Too many packages and obstacles for grid size")
 
+    layer = cost_layer(costs, N, M, connectivity)
+    closed = np.zeros((N, M), dtype=bool) if layer is None else ~np.isfinite(layer).any(axis=0)
+
     # Initialize empty warehouse
     warehouse = np.full((N, M), '.')
     package_locations, dropoff_locations, obstacle_locations = [], [], []
@@ -53,6 +100,7 @@ def setup_warehouse(N=8, M=8, P=4, O=5):
             if (package != dropoff and 
                 package not in package_locations and 
                 dropoff not in dropoff_locations and
+                not closed[package] and not closed[dropoff] and
                 warehouse[package[0]][package[1]] == '.' and
                 warehouse[dropoff[0]][dropoff[1]] == '.'):
                 package_locations.append(package)
@@ -90,29 +138,48 @@ def setup_warehouse(N=8, M=8, P=4, O=5):
 
     return warehouse, package_locations, dropoff_locations, obstacle_locations
 
-def ucs(start, goal, grid, N, M):
-    """Uniform Cost Search implementation."""
+def ucs(start, goal, grid, N, M, stats=None, costs=None, connectivity=4):
+    """Uniform Cost Search implementation.
+
+    ``costs`` is an optional cost layer (see ``cost_layer``) and
+    ``connectivity`` selects 4- or 8-way moves. Obstacles block moves, and a
+    diagonal move may not cut the corner of an obstacle. If a ``stats`` dict
+    is given, the number of expanded nodes is added to ``stats["expansions"]``.
+    """
+    moves = grid_moves(connectivity)
+    layer = cost_layer(costs, N, M, connectivity)
     frontier = PriorityQueue()
     frontier.put((0, start))
     came_from = {start: None}
     cost_so_far = {start: 0}
-    directions = [(-1,0), (1,0), (0,-1), (0,1)]
     
     while not frontier.empty():
         cost, current = frontier.get()
+        if cost > cost_so_far[current]:
+            continue  # stale entry, already expanded at a lower cost
+        if stats is not None:
+            stats["expansions"] = stats.get("expansions", 0) + 1
         if current == goal:
             break
             
-        for d in directions:
-            next_pos = (current[0] + d[0], current[1] + d[1])
-            if 0 <= next_pos[0] < N and 0 <= next_pos[1] < M:
-                if grid[next_pos[0]][next_pos[1]] == 'O':
+        row, col = current
+        for k, (dr, dc) in enumerate(moves):
+            r, c = row + dr, col + dc
+            if not (0 <= r < N and 0 <= c < M) or grid[r][c] == 'O':
+                continue
+            if dr and dc and (grid[r][col] == 'O' or grid[row][c] == 'O'):
+                continue
+            if layer is None:
+                new_cost = cost + MOVE_LENGTHS[k]
+            else:
+                new_cost = cost + float(layer[k, r, c]) * MOVE_LENGTHS[k]
+                if new_cost == float('inf'):
                     continue
-                new_cost = cost + 1
-                if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
-                    cost_so_far[next_pos] = new_cost
-                    frontier.put((new_cost, next_pos))
-                    came_from[next_pos] = current
+            next_pos = (r, c)
+            if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
+                cost_so_far[next_pos] = new_cost
+                frontier.put((new_cost, next_pos))
+                came_from[next_pos] = current
     
     if goal in cost_so_far:
         path = []
@@ -124,8 +191,171 @@ def ucs(start, goal, grid, N, M):
         return path, cost_so_far[goal]
     return None, None
 
-def run_agent_simulation(warehouse, package_locations, dropoff_locations, start=(0,0)):
-    """Simulate the agent delivering all packages."""
+def _shift(a, dr, dc, fill):
+    """Return ``b`` with ``b[..., r, c] = a[..., r + dr, c + dc]``, ``fill`` outside the grid."""
+    N, M = a.shape[-2:]
+    b = np.full_like(a, fill)
+    if abs(dr) >= N or abs(dc) >= M:
+        return b
+    b[..., max(-dr, 0):N - max(dr, 0), max(-dc, 0):M - max(dc, 0)] = \
+        a[..., max(dr, 0):N - max(-dr, 0), max(dc, 0):M - max(-dc, 0)]
+    return b
+
+def step_costs(grid, costs=None, connectivity=4):
+    """Return a ``(K, N, M)`` array: the cost of each move out of each cell.
+
+    Follows the same rules as ``ucs``; illegal moves cost ``inf``.
+    """
+    N, M = grid.shape
+    moves = grid_moves(connectivity)
+    layer = cost_layer(costs, N, M, connectivity)
+    blocked = grid == 'O'
+    steps = np.empty((len(moves), N, M))
+    for k, (dr, dc) in enumerate(moves):
+        entry = np.ones((N, M)) if layer is None else layer[k]
+        step = _shift(entry, dr, dc, np.inf) * MOVE_LENGTHS[k]
+        cut = blocked | _shift(blocked, dr, dc, True)
+        if dr and dc:
+            cut |= _shift(blocked, dr, 0, True) | _shift(blocked, 0, dc, True)
+        step[cut] = np.inf
+        steps[k] = step
+    return steps
+
+def _shift_row(a, d, fill):
+    """Return ``b`` with ``b[c] = a[c + d]``, ``fill`` outside the row."""
+    b = np.full_like(a, fill)
+    if d > 0:
+        b[:-d] = a[d:]
+    elif d < 0:
+        b[-d:] = a[:d]
+    else:
+        b[:] = a
+    return b
+
+def _scan_row(values, weights, d):
+    """Relax ``values[c] = min(values[c], weights[c] + values[c + d])`` along the whole row.
+
+    A min-plus prefix scan by doubling: after the pass with shift ``s`` every
+    cell has seen chains of up to ``2s`` moves, so ``log2(M)`` array passes
+    replace a per-cell loop.
+    """
+    s = 1
+    while s < len(values) and np.isfinite(weights).any():
+        values = np.minimum(values, weights + _shift_row(values, s * d, np.inf))
+        weights = weights + _shift_row(weights, s * d, np.inf)
+        s *= 2
+    return values
+
+def cost_to_go(goal, grid, costs=None, connectivity=4, steps=None):
+    """Return an ``(N, M)`` array with the cheapest cost from every cell to ``goal``.
+
+    Computed with vectorized raster sweeps instead of a heap: rows are
+    visited alternately top-down and bottom-up; each row takes the moves into
+    its two neighbouring rows and is then relaxed horizontally in both
+    directions with a prefix scan. A row is only revisited after one of its
+    neighbours changed, and sweeping stops when no row is left to revisit.
+    Unreachable cells are ``inf``. Use it when many cells need their distance
+    to one goal; ``ucs`` is cheaper for a single point-to-point query.
+    ``steps`` is an optional precomputed ``step_costs`` array for the same
+    grid, costs and connectivity.
+    """
+    N, M = grid.shape
+    moves = grid_moves(connectivity)
+    if steps is None:
+        steps = step_costs(grid, costs, connectivity)
+    field = np.full((N, M), np.inf)
+    if grid[goal] == 'O':
+        return field
+    field[goal] = 0.0
+
+    vertical = [(k, dr, dc) for k, (dr, dc) in enumerate(moves) if dr]
+    horizontal = [(moves.index((0, 1)), 1), (moves.index((0, -1)), -1)]
+    dirty = np.zeros(N, dtype=bool)
+    dirty[max(goal[0] - 1, 0):goal[0] + 2] = True
+    downward = True
+    while dirty.any():
+        for r in (range(N) if downward else range(N - 1, -1, -1)):
+            if not dirty[r]:
+                continue
+            dirty[r] = False
+            row = field[r]
+            for k, dr, dc in vertical:
+                if 0 <= r + dr < N:
+                    row = np.minimum(row, steps[k, r] + _shift_row(field[r + dr], dc, np.inf))
+            for k, d in horizontal:
+                row = _scan_row(row, steps[k, r], d)
+            if not np.array_equal(row, field[r]):
+                field[r] = row
+                dirty[max(r - 1, 0):r + 2] = True
+                dirty[r] = False
+        downward = not downward
+    return field
+
+def field_path(start, goal, field, grid, N, M, costs=None, connectivity=4, steps=None):
+    """Follow a ``cost_to_go`` field downhill from ``start``; returns ``(path, cost)`` like ``ucs``.
+
+    Building ``step_costs`` touches the whole grid, so callers following one
+    field from many starts should compute it once and pass it as ``steps``.
+    """
+    if not np.isfinite(field[start]):
+        return None, None
+    moves = grid_moves(connectivity)
+    if steps is None:
+        steps = step_costs(grid, costs, connectivity)
+    path = [start]
+    cost = 0
+    current = start
+    while current != goal:
+        if len(path) > N * M:
+            raise RuntimeError("Cost field does not lead to the goal")
+        best = None
+        for k, (dr, dc) in enumerate(moves):
+            step = steps[k][current]
+            if step == np.inf:
+                continue
+            next_pos = (current[0] + dr, current[1] + dc)
+            if best is None or step + field[next_pos] < best[0]:
+                best = (step + field[next_pos], next_pos, step)
+        _, current, step = best
+        cost += float(step)
+        path.append(current)
+    return path, cost
+
+def encode_path(path):
+    """Run-length encode a path as ``[(d_row, d_col, count), ...]`` moves from its first cell."""
+    runs = []
+    for (r0, c0), (r1, c1) in zip(path, path[1:]):
+        move = (r1 - r0, c1 - c0)
+        if runs and runs[-1][:2] == move:
+            runs[-1] = (move[0], move[1], runs[-1][2] + 1)
+        else:
+            runs.append((move[0], move[1], 1))
+    return runs
+
+def decode_path(start, runs):
+    """Expand ``encode_path`` runs back into the list of visited cells."""
+    path = [tuple(start)]
+    for dr, dc, count in runs:
+        for _ in range(count):
+            r, c = path[-1]
+            path.append((r + dr, c + dc))
+    return path
+
+def _cell(pos):
+    return (int(pos[0]), int(pos[1]))
+
+def iter_agent_simulation(warehouse, package_locations, dropoff_locations, start=(0,0),
+                          costs=None, connectivity=4, log_path=None):
+    """Simulate the agent delivering all packages, yielding events as they happen.
+
+    Each delivery yields a ``move`` event to the package, ``pickup``, a
+    ``move`` event to the drop-off and ``drop``. Move events carry the leg's
+    start cell and run-length encoded ``runs`` (see ``encode_path``) instead of
+    the full path, and legs are only planned when the consumer asks for the
+    next event. The run ends with ``done`` holding the totals, or ``blocked``
+    if a leg has no path. With ``log_path`` every event is also appended to
+    that file as one JSON line, which ``replay_events`` reads back.
+    """
     if not package_locations or not dropoff_locations:
         raise ValueError("No packages or drop-off points provided")
     if len(package_locations) != len(dropoff_locations):
@@ -135,38 +365,82 @@ def run_agent_simulation(warehouse, package_locations, dropoff_locations, start=
     if not (0 <= start[0] < N and 0 <= start[1] < M):
         raise ValueError("Invalid start position")
 
+    events = _simulate(warehouse, package_locations, dropoff_locations, start, costs, connectivity)
+    if log_path is None:
+        return events
+    return _logged(events, log_path)
+
+def _simulate(warehouse, package_locations, dropoff_locations, start, costs, connectivity):
+    N, M = warehouse.shape
     total_cost = 0
     total_reward = 0
-    paths = []
-    current_position = start
-    
+    current_position = _cell(start)
+    yield {"event": "start", "position": current_position, "packages": len(package_locations)}
+
     for i in range(len(package_locations)):
-        package = package_locations[i]
-        dropoff = dropoff_locations[i]
-        
-        # Find path to package
-        path_to_package, cost_to_package = ucs(current_position, package, warehouse, N, M)
-        if path_to_package is None:
-            return None, None, None, None  # No valid path found
-            
-        # Find path from package to drop-off
-        path_to_dropoff, cost_to_dropoff = ucs(package, dropoff, warehouse, N, M)
-        if path_to_dropoff is None:
+        legs = (("to_package", _cell(package_locations[i]), "pickup"),
+                ("to_dropoff", _cell(dropoff_locations[i]), "drop"))
+        for leg, target, action in legs:
+            path, cost = ucs(current_position, target, warehouse, N, M,
+                             costs=costs, connectivity=connectivity)
+            if path is None:
+                yield {"event": "blocked", "package": i + 1, "leg": leg,
+                       "position": current_position, "target": target}
+                return
+            total_cost += cost
+            yield {"event": "move", "package": i + 1, "leg": leg, "start": current_position,
+                   "runs": encode_path(path), "steps": len(path) - 1, "cost": cost}
+            current_position = target
+            if action == "drop":
+                total_reward += 10  # Delivery reward
+                yield {"event": "drop", "package": i + 1, "position": target, "reward": 10}
+            else:
+                yield {"event": "pickup", "package": i + 1, "position": target}
+
+    yield {"event": "done", "total_cost": total_cost, "total_reward": total_reward,
+           "final_reward": total_reward - total_cost}
+
+def _logged(events, log_path):
+    with open(log_path, "a") as log:
+        for event in events:
+            log.write(json.dumps(event) + "\n")
+            log.flush()
+            yield event
+
+def replay_events(log_path):
+    """Yield the events of an ``iter_agent_simulation`` log without recomputing them."""
+    with open(log_path) as log:
+        for line in log:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            for key in ("position", "start", "target"):
+                if key in event:
+                    event[key] = tuple(event[key])
+            if "runs" in event:
+                event["runs"] = [tuple(run) for run in event["runs"]]
+            yield event
+
+def run_agent_simulation(warehouse, package_locations, dropoff_locations, start=(0,0),
+                         costs=None, connectivity=4):
+    """Simulate the agent delivering all packages."""
+    paths = []
+    for event in iter_agent_simulation(warehouse, package_locations, dropoff_locations,
+                                       start, costs, connectivity):
+        if event["event"] == "blocked":
             return None, None, None, None  # No valid path found
-            
-        total_cost += (cost_to_package + cost_to_dropoff)
-        total_reward += 10  # Delivery reward
-        
-        paths.append({
-            "package": package,
-            "path_to_package": path_to_package,
-            "cost_to_package": cost_to_package,
-            "dropoff": dropoff,
-            "path_to_dropoff": path_to_dropoff,
-            "cost_to_dropoff": cost_to_dropoff
-        })
-        
-        current_position = dropoff
-    
-    final_reward = total_reward - total_cost
-    return total_cost, total_reward, final_reward, paths
+        if event["event"] == "move" and event["leg"] == "to_package":
+            i = event["package"] - 1
+            paths.append({
+                "package": package_locations[i],
+                "path_to_package": decode_path(event["start"], event["runs"]),
+                "cost_to_package": event["cost"],
+            })
+        elif event["event"] == "move":
+            paths[-1].update({
+                "dropoff": dropoff_locations[event["package"] - 1],
+                "path_to_dropoff": decode_path(event["start"], event["runs"]),
+                "cost_to_dropoff": event["cost"]
+            })
+        elif event["event"] == "done":
+            return event["total_cost"], event["total_reward"], event["final_reward"], paths